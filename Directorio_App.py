@@ -10,9 +10,27 @@
 
 from datetime import datetime, timezone
 from pathlib import Path
+import hashlib
 import io
+import numpy as np
 import pandas as pd
 import streamlit as st
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.utils import get_column_letter
+
+# Copy-on-Write: los filtros/selecciones no copian datos hasta que se modifican
+pd.set_option("mode.copy_on_write", True)
+
+try:
+    import polars as pl
+except ImportError:  # sin polars, la agregación por cliente se hace en pandas
+    pl = None
+
+try:
+    from numba import njit
+except ImportError:  # opcional (pip install numba): acelera la versión solo-pandas
+    njit = None
 
 # === (A) CONFIGURACIÓN GENERAL ================================================
 DIAS_EN_USO = 90
@@ -31,6 +49,9 @@ FECHAS_COLS = [
     "fecha de envio",
 ]
 
+# Únicas columnas de la hoja de ventas que usa el directorio (el resto no se lee)
+VENTAS_COLS = [COL_CLIENTE, COL_VENDEDOR, *FECHAS_COLS]
+
 # Campos del catálogo
 CAT_LLAVE  = "Cliente"
 CAT_CIUDAD = "Ciudad"
@@ -39,6 +60,12 @@ CAT_PAIS   = "País"
 CAT_PROV   = "Provincia"
 CAT_TEL    = "Teléfono"
 
+# Columna interna con el texto de búsqueda ya en minúsculas (no se muestra ni se exporta)
+COL_BUSQUEDA = "_search"
+
+# Columnas de texto que se guardan como string[pyarrow] (UTF-8 contiguo, kernels de Arrow)
+TEXTO_COLS = [COL_CLIENTE, COL_VENDEDOR, CAT_CIUDAD, CAT_EMAIL, CAT_PAIS, CAT_PROV, CAT_TEL]
+
 # Hoja de catálogo dentro del MISMO Excel y mapeo por letras
 CATALOGO_EN_VENTAS_SHEET = "listado completo de clientes al"  # nombre exacto de la hoja
 # Letras -> nombre de columna
@@ -69,10 +96,24 @@ SHEET_VENTAS = "Historico_de_ventas"  # <-- tu hoja real
 # Dónde está tu JSON de la cuenta de servicio cuando corres LOCAL en VS Code:
 GCP_SA_JSON_PATH = "api-directoriodeclientes-derma-0390d6eea4c2.json"
 
+# Tamaño de cada petición HTTP al descargar de Drive (menos viajes de ida y vuelta)
+DRIVE_CHUNK_SIZE = 8 * 1024 * 1024
+
 # --- Si usas LOCAL (archivo .xlsx al lado del .py) ----------------------------
 VENTAS_FILE = Path("Base de clientes con historico_RAW.xlsx")
 CATALOGO_FILE = Path("Catalogo_clientes.xlsx")  # opcional
 
+# Motor de lectura de Excel (python-calamine, en Rust; la escritura es con openpyxl)
+EXCEL_ENGINE = "calamine"
+
+# Hojas que se leen del Excel de ventas (el libro se abre una sola vez) y sus opciones de lectura
+HOJAS_VENTAS = (SHEET_VENTAS, CATALOGO_EN_VENTAS_SHEET)
+OPCIONES_HOJAS = {
+    SHEET_VENTAS: {"dtype": {COL_CLIENTE: "string[pyarrow]"}, "usecols": lambda c: c in VENTAS_COLS},
+    # Catálogo por letras (A..F); header=None por si no hay encabezados formales
+    CATALOGO_EN_VENTAS_SHEET: {"usecols": ",".join(CAT_MAP.keys()), "header": None},
+}
+
 
 # === (C) CARGA DESDE DRIVE (cuenta de servicio) ===============================
 def _import_drive_libs():
@@ -90,33 +131,75 @@ def _drive_service_from_file(json_path: str):
     )
     return build("drive", "v3", credentials=creds, cache_discovery=False)
 
-@st.cache_data(show_spinner=True)
-def download_drive_file_as_bytes(file_id: str, json_path: str) -> bytes:
+def download_drive_file(file_id: str, json_path: str) -> io.BytesIO:
+    """Descarga el archivo de Drive a un BytesIO listo para leer (sin caché: se cachea ya parseado)."""
     _, _, MediaIoBaseDownload = _import_drive_libs()
     service = _drive_service_from_file(json_path)
     request = service.files().get_media(fileId=file_id)
     buf = io.BytesIO()
-    downloader = MediaIoBaseDownload(buf, request)
+    downloader = MediaIoBaseDownload(buf, request, chunksize=DRIVE_CHUNK_SIZE)
     done = False
     while not done:
         status, done = downloader.next_chunk()
     buf.seek(0)
-    return buf.read()
+    return buf
 
 @st.cache_data(show_spinner=True)
 def read_excel_from_drive(file_id: str, sheet_name: str, json_path: str, **pd_kwargs) -> pd.DataFrame:
     """Lee una hoja del Excel de Drive y permite pasar kwargs a pandas.read_excel."""
-    binary = download_drive_file_as_bytes(file_id, json_path)
-    with io.BytesIO(binary) as bio:
-        df = pd.read_excel(bio, sheet_name=sheet_name, **pd_kwargs)
+    with download_drive_file(file_id, json_path) as bio:
+        df = pd.read_excel(bio, sheet_name=sheet_name, engine=EXCEL_ENGINE, **pd_kwargs)
     return df
 
+def leer_hojas_excel(src, sheets: tuple[str, ...]) -> dict[str, pd.DataFrame]:
+    """Abre el libro una vez y lee cada hoja con sus OPCIONES_HOJAS; omite las que no existan."""
+    with pd.ExcelFile(src, engine=EXCEL_ENGINE) as xls:
+        return {
+            s: xls.parse(s, **OPCIONES_HOJAS.get(s, {}))
+            for s in sheets
+            if s in xls.sheet_names
+        }
+
+@st.cache_data(show_spinner=True)
+def load_workbook_sheets(file_id: str, json_path: str, sheets: tuple[str, ...]) -> dict[str, pd.DataFrame]:
+    """Descarga el Excel de Drive una sola vez y devuelve {hoja: DataFrame}."""
+    with download_drive_file(file_id, json_path) as bio:
+        return leer_hojas_excel(bio, sheets)
+
+@st.cache_data(show_spinner=True)
+def load_local_workbook_sheets(path: str, mtime: float, sheets: tuple[str, ...]) -> dict[str, pd.DataFrame]:
+    """Igual que load_workbook_sheets para un Excel local; `mtime` invalida la caché si el archivo cambia."""
+    return leer_hojas_excel(Path(path), sheets)
+
+def hoja_ventas(hojas: dict[str, pd.DataFrame]) -> pd.DataFrame:
+    if SHEET_VENTAS not in hojas:
+        raise ValueError(f"No encuentro la hoja '{SHEET_VENTAS}' en el Excel de ventas.")
+    return hojas[SHEET_VENTAS]
+
 
 # === (D) UTILIDADES ===========================================================
+def _hash_df(d: pd.DataFrame) -> tuple:
+    """Llave de caché para DataFrames: columnas, dtypes y hash de las filas en orden."""
+    filas = pd.util.hash_pandas_object(d, index=False).to_numpy()
+    return tuple(d.columns), tuple(d.dtypes.astype(str)), hashlib.sha1(filas.tobytes()).hexdigest()
+
+_HASH_DF = {pd.DataFrame: _hash_df}
+
+def hoy_utc() -> pd.Timestamp:
+    return pd.Timestamp(datetime.now(timezone.utc).date())
+
+def textos_arrow(df: pd.DataFrame) -> pd.DataFrame:
+    """Convierte las TEXTO_COLS presentes a string[pyarrow]."""
+    for c in TEXTO_COLS:
+        if c in df.columns:
+            df[c] = df[c].astype("string[pyarrow]")
+    return df
+
 def _to_datetime(s: pd.Series) -> pd.Series:
-    return pd.to_datetime(s, errors="coerce", infer_datetime_format=True)
+    return pd.to_datetime(s, errors="coerce", format="mixed", cache=True)
 
 def preparar_ventas(df: pd.DataFrame) -> pd.DataFrame:
+    df = textos_arrow(df)
     existentes = []
     for c in FECHAS_COLS:
         if c in df.columns:
@@ -124,68 +207,135 @@ def preparar_ventas(df: pd.DataFrame) -> pd.DataFrame:
             existentes.append(c)
     if not existentes:
         raise ValueError("No se encontraron columnas de fecha válidas. Ajusta FECHAS_COLS.")
-    df["FechaVenta_Fila"] = df[existentes].max(axis=1, skipna=True)
+    # Máximo por fila sobre la vista int64: NaT es el mínimo de int64, así que nunca gana
+    arr = np.stack([df[c].to_numpy("datetime64[ns]").view("i8") for c in existentes])
+    df["FechaVenta_Fila"] = arr.max(axis=0).view("datetime64[ns]")
     return df
 
-def calcular_directorio(df_ventas: pd.DataFrame) -> pd.DataFrame:
-    df = df_ventas.copy()
-    df = df[df[COL_CLIENTE].notna()].copy()
-    df[COL_CLIENTE] = df[COL_CLIENTE].astype("string").str.strip()
+def _agregar_clientes_polars(df: pd.DataFrame) -> pd.DataFrame:
+    """Última fecha y último vendedor por cliente en un solo group_by de Polars."""
+    res = (
+        pl.from_pandas(df[[COL_CLIENTE, "FechaVenta_Fila", COL_VENDEDOR]])
+        .lazy()
+        .group_by(COL_CLIENTE)
+        .agg(
+            pl.col("FechaVenta_Fila").max().alias("UltimaFechaVenta"),
+            # Primera fila con la fecha máxima (como idxmax); null si el cliente no tiene fechas
+            pl.col(COL_VENDEDOR).get(pl.col("FechaVenta_Fila").arg_max()).alias("UltimoVendedor"),
+        )
+        .collect()
+        .to_pandas()
+    )
+    for c in [COL_CLIENTE, "UltimoVendedor"]:
+        res[c] = res[c].astype("string[pyarrow]")
+    return res
+
+if njit is not None:
+    @njit(cache=True)
+    def _ultimo_por_grupo(codes, fechas_i8, v_codes, ngroups):
+        """Una pasada: fecha máxima por grupo y código del vendedor en esa fila (-1 si no hay)."""
+        best = np.full(ngroups, np.iinfo(np.int64).min, dtype=np.int64)
+        out = np.full(ngroups, -1, dtype=np.int64)
+        for i in range(codes.size):
+            g = codes[i]
+            d = fechas_i8[i]
+            if d > best[g]:  # NaT es el mínimo de int64: nunca gana
+                best[g] = d
+                out[g] = v_codes[i]
+        return best, out
+
+def _agregar_clientes_numba(df: pd.DataFrame) -> pd.DataFrame:
+    """Misma agregación que _agregar_clientes_polars, con factorize + kernel de Numba."""
+    codes, clientes = pd.factorize(df[COL_CLIENTE])
+    v_codes, vendedores = pd.factorize(df[COL_VENDEDOR])
+    fechas = df["FechaVenta_Fila"].to_numpy("datetime64[ns]").view("i8")
+    best, out = _ultimo_por_grupo(codes, fechas, v_codes, len(clientes))
+    return pd.DataFrame({
+        COL_CLIENTE: clientes.array,
+        "UltimaFechaVenta": best.view("datetime64[ns]"),
+        "UltimoVendedor": vendedores.array.take(out, allow_fill=True),
+    })
+
+def _agregar_clientes_pandas(df: pd.DataFrame) -> pd.DataFrame:
+    """Misma agregación que _agregar_clientes_polars, con groupby/idxmax de pandas."""
+    # Un solo groupby: última fecha y la fila donde ocurre (de ahí sale el último vendedor)
+    fechadas = df.dropna(subset=["FechaVenta_Fila"])
+    agg = fechadas.groupby(COL_CLIENTE, sort=False).agg(
+        UltimaFechaVenta=("FechaVenta_Fila", "max"),
+        _idx=("FechaVenta_Fila", "idxmax"),
+    )
+    agg["UltimoVendedor"] = df.loc[agg["_idx"], COL_VENDEDOR].array
+    # Clientes sin ninguna fecha se conservan (quedan como "Disponible")
+    return (
+        agg.drop(columns="_idx")
+        .reindex(df[COL_CLIENTE].unique())
+        .rename_axis(COL_CLIENTE)
+        .reset_index()
+    )
 
-    agg = df.groupby(COL_CLIENTE, as_index=False).agg(UltimaFechaVenta=("FechaVenta_Fila", "max"))
+@st.cache_data(show_spinner=False, max_entries=8, hash_funcs=_HASH_DF)
+def calcular_directorio(df_ventas: pd.DataFrame, hoy: pd.Timestamp | None = None) -> pd.DataFrame:
+    """Directorio por cliente. `hoy` forma parte de la llave de caché: pásalo explícito (ver hoy_utc)."""
+    df = df_ventas[df_ventas[COL_CLIENTE].notna()]
+    df[COL_CLIENTE] = df[COL_CLIENTE].str.strip()
 
-    hoy = pd.Timestamp(datetime.now(timezone.utc).date())
+    if pl is not None:
+        agg = _agregar_clientes_polars(df)
+    elif njit is not None:
+        agg = _agregar_clientes_numba(df)
+    else:
+        agg = _agregar_clientes_pandas(df)
+
+    if hoy is None:
+        hoy = hoy_utc()
     agg["Dias_desde_ultima_venta"] = (hoy - agg["UltimaFechaVenta"]).dt.days
 
-    def _estatus(row):
-        f = row["UltimaFechaVenta"]
-        if pd.isna(f):
-            return "Disponible"
-        return "En uso" if row["Dias_desde_ultima_venta"] < DIAS_EN_USO else "Disponible"
-
-    agg["Estatus"] = agg.apply(_estatus, axis=1)
-
-    # Último vendedor = el de la fila con la última fecha
-    join_cols = [COL_CLIENTE, "FechaVenta_Fila", COL_VENDEDOR]
-    join_cols = [c for c in join_cols if c in df.columns]
-    df_join = df[join_cols].copy()
-
-    dir_df = (
-        agg.merge(
-            df_join,
-            left_on=[COL_CLIENTE, "UltimaFechaVenta"],
-            right_on=[COL_CLIENTE, "FechaVenta_Fila"],
-            how="left",
-        )
-        .sort_values([COL_CLIENTE, "FechaVenta_Fila"], ascending=[True, False])
-        .drop_duplicates(subset=[COL_CLIENTE], keep="first")
-        .rename(columns={COL_VENDEDOR: "UltimoVendedor"})
-    )
+    mask_disp = agg["UltimaFechaVenta"].isna() | (agg["Dias_desde_ultima_venta"] >= DIAS_EN_USO)
+    # Categóricos: filtrar/ordenar compara códigos enteros en vez de strings
+    agg["Estatus"] = pd.Categorical(np.where(mask_disp, "Disponible", "En uso"), categories=["Disponible", "En uso"])
+    agg["UltimoVendedor"] = agg["UltimoVendedor"].astype("category")
 
-    out = dir_df[
-        [COL_CLIENTE, "Estatus", "Dias_desde_ultima_venta", "UltimoVendedor", "UltimaFechaVenta"]
-    ].copy()
+    out = agg[[COL_CLIENTE, "Estatus", "Dias_desde_ultima_venta", "UltimoVendedor", "UltimaFechaVenta"]]
 
-    return out.sort_values(["Estatus", "Dias_desde_ultima_venta"], ascending=[True, True]).reset_index(drop=True)
+    # Cliente como desempate: el orden no depende de cómo salieron los grupos
+    return out.sort_values(["Estatus", "Dias_desde_ultima_venta", COL_CLIENTE]).reset_index(drop=True)
 
+@st.cache_data(show_spinner=False, max_entries=16, hash_funcs=_HASH_DF)
 def to_excel_bytes(df: pd.DataFrame) -> bytes:
+    """XLSX con openpyxl en modo write_only: las filas se escriben en streaming."""
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("Directorio")
+    for i in range(1, df.shape[1] + 1):
+        ws.column_dimensions[get_column_letter(i)].width = 22
+    ws.append(list(df.columns))
+
+    # openpyxl no entiende NA/NaT: valores Python nativos y None para vacíos
+    datos = df.astype(object).where(df.notna(), None)
+    cols_fecha = [i for i, c in enumerate(df.columns) if pd.api.types.is_datetime64_any_dtype(df[c])]
+    for fila in datos.itertuples(index=False, name=None):
+        fila = list(fila)
+        for i in cols_fecha:
+            if fila[i] is not None:
+                celda = WriteOnlyCell(ws, value=fila[i])
+                celda.number_format = "yyyy-mm-dd"
+                fila[i] = celda
+        ws.append(fila)
+
     bio = io.BytesIO()
-    with pd.ExcelWriter(bio, engine="xlsxwriter", datetime_format="yyyy-mm-dd") as w:
-        df.to_excel(w, index=False, sheet_name="Directorio")
-        ws = w.sheets["Directorio"]
-        ws.set_column(0, max(0, df.shape[1] - 1), 22)
+    wb.save(bio)
     return bio.getvalue()
 
 # --- Cargar catálogo externo opcional (si existiera archivo aparte) -----------
 def cargar_catalogo_local(path: Path, sheet: str) -> pd.DataFrame | None:
     if not path.exists():
         return None
-    cat = pd.read_excel(path, sheet_name=sheet)
+    cat = pd.read_excel(path, sheet_name=sheet, engine=EXCEL_ENGINE)
     if CAT_LLAVE not in cat.columns:
         return None
-    cat[CAT_LLAVE] = cat[CAT_LLAVE].astype("string").str.strip()
+    cat = textos_arrow(cat)
+    cat[CAT_LLAVE] = cat[CAT_LLAVE].str.strip()
     cols = [c for c in [CAT_LLAVE, CAT_CIUDAD, CAT_EMAIL, CAT_PAIS, CAT_PROV, CAT_TEL] if c in cat.columns]
-    return cat[cols].copy()
+    return cat[cols]
 
 def cargar_catalogo_drive(file_id: str | None, sheet: str, json_path: str) -> pd.DataFrame | None:
     if not file_id:
@@ -193,45 +343,31 @@ def cargar_catalogo_drive(file_id: str | None, sheet: str, json_path: str) -> pd
     cat = read_excel_from_drive(file_id, sheet, json_path)
     if CAT_LLAVE not in cat.columns:
         return None
-    cat[CAT_LLAVE] = cat[CAT_LLAVE].astype("string").str.strip()
+    cat = textos_arrow(cat)
+    cat[CAT_LLAVE] = cat[CAT_LLAVE].str.strip()
     cols = [c for c in [CAT_LLAVE, CAT_CIUDAD, CAT_EMAIL, CAT_PAIS, CAT_PROV, CAT_TEL] if c in cat.columns]
-    return cat[cols].copy()
+    return cat[cols]
 
 # --- NUEVO: Cargar catálogo desde la hoja del MISMO Excel ---------------------
-@st.cache_data(show_spinner=True)
-def cargar_catalogo_mismo_excel(modo: str) -> pd.DataFrame | None:
+def cargar_catalogo_mismo_excel(hojas: dict[str, pd.DataFrame]) -> pd.DataFrame | None:
     """
-    Lee la hoja 'listado completo de clientes al' del mismo Excel de ventas.
-    Interpreta columnas por letras (A..F) y renombra según CAT_MAP.
+    Toma la hoja 'listado completo de clientes al' ya leída del mismo Excel de ventas.
+    Las columnas vienen por letras (A..F, ver OPCIONES_HOJAS) y se renombran según CAT_MAP.
     """
-    usecols = ",".join(CAT_MAP.keys())  # por ej. "C,A,B,D,E,F" (el orden lo conservamos)
     letras = list(CAT_MAP.keys())
     nombres = [CAT_MAP[l] for l in letras]
 
     try:
-        if modo.lower() == "drive":
-            cat = read_excel_from_drive(
-                GDRIVE_FILE_ID_VENTAS,
-                CATALOGO_EN_VENTAS_SHEET,
-                GCP_SA_JSON_PATH,
-                usecols=usecols,
-                header=None,   # por si no hay encabezados formales
-            )
-        else:
-            if not VENTAS_FILE.exists():
-                return None
-            cat = pd.read_excel(
-                VENTAS_FILE,
-                sheet_name=CATALOGO_EN_VENTAS_SHEET,
-                usecols=usecols,
-                header=None,
-            )
+        if CATALOGO_EN_VENTAS_SHEET not in hojas:
+            raise ValueError("la hoja no existe en el Excel de ventas")
+        cat = hojas[CATALOGO_EN_VENTAS_SHEET]
         # Renombrar columnas en el mismo orden de "letras"
         cat.columns = nombres
+        cat = textos_arrow(cat)
 
         # Normaliza Cliente
         if CAT_LLAVE in cat.columns:
-            cat[CAT_LLAVE] = cat[CAT_LLAVE].astype("string").str.strip()
+            cat[CAT_LLAVE] = cat[CAT_LLAVE].str.strip()
 
         # Nos quedamos solo con columnas esperadas
         cols_ok = [c for c in [CAT_LLAVE, CAT_CIUDAD, CAT_EMAIL, CAT_PAIS, CAT_PROV, CAT_TEL] if c in cat.columns]
@@ -239,14 +375,25 @@ def cargar_catalogo_mismo_excel(modo: str) -> pd.DataFrame | None:
         # Si hay duplicados de Cliente, nos quedamos con el primero (o podrías agregar una lógica de preferencia)
         cat = cat.dropna(subset=[CAT_LLAVE]).drop_duplicates(subset=[CAT_LLAVE], keep="first")
 
-        return cat[cols_ok].copy()
+        return cat[cols_ok]
     except Exception as e:
         st.warning(f"No se pudo leer el catálogo de '{CATALOGO_EN_VENTAS_SHEET}': {e}")
         return None
 
+def agregar_busqueda(df: pd.DataFrame) -> pd.DataFrame:
+    """Concatena Cliente + catálogo en COL_BUSQUEDA (minúsculas) para buscar con un solo contains."""
+    campos = [c for c in [COL_CLIENTE, CAT_CIUDAD, CAT_EMAIL, CAT_PAIS, CAT_PROV, CAT_TEL] if c in df.columns]
+    # "\n" como separador: no se puede teclear en el buscador, así que no une campos
+    blob = df[campos[0]].astype("string[pyarrow]").fillna("")
+    for c in campos[1:]:
+        blob = blob + "\n" + df[c].astype("string[pyarrow]").fillna("")
+    df[COL_BUSQUEDA] = blob.str.lower()
+    return df
+
+@st.cache_data(show_spinner=False, max_entries=8, hash_funcs=_HASH_DF)
 def merge_catalogo(directorio: pd.DataFrame, cat: pd.DataFrame | None) -> pd.DataFrame:
     if cat is None:
-        return directorio
+        return agregar_busqueda(directorio)
     out = directorio.merge(cat, left_on=COL_CLIENTE, right_on=CAT_LLAVE, how="left")
     orden = [
         COL_CLIENTE,
@@ -258,7 +405,7 @@ def merge_catalogo(directorio: pd.DataFrame, cat: pd.DataFrame | None) -> pd.Dat
         "Estatus", "Dias_desde_ultima_venta", "UltimoVendedor", "UltimaFechaVenta",
     ]
     orden = [c for c in orden if c and c in out.columns]
-    return out[orden].copy()
+    return agregar_busqueda(out[orden])
 
 
 # === (E) UI ===================================================================
@@ -267,10 +414,10 @@ st.title("Directorio de clientes")
 
 try:
     if MODO_CARGA.lower() == "drive":
-        ventas_raw = read_excel_from_drive(GDRIVE_FILE_ID_VENTAS, SHEET_VENTAS, GCP_SA_JSON_PATH, dtype={COL_CLIENTE: "string"})
-        ventas = preparar_ventas(ventas_raw)
+        hojas = load_workbook_sheets(GDRIVE_FILE_ID_VENTAS, GCP_SA_JSON_PATH, HOJAS_VENTAS)
+        ventas = preparar_ventas(hoja_ventas(hojas))
         # 1) Catálogo desde la hoja del mismo Excel
-        catalogo = cargar_catalogo_mismo_excel("drive")
+        catalogo = cargar_catalogo_mismo_excel(hojas)
         # 2) Si no hubo éxito, intento con archivo de catálogo separado en Drive (opcional)
         if catalogo is None:
             catalogo = cargar_catalogo_drive(GDRIVE_FILE_ID_CATALOGO, SHEET_CATALOGO, GCP_SA_JSON_PATH)
@@ -278,10 +425,10 @@ try:
     else:
         if not VENTAS_FILE.exists():
             raise FileNotFoundError(f"No encuentro {VENTAS_FILE.resolve()}")
-        ventas_raw = pd.read_excel(VENTAS_FILE, sheet_name=SHEET_VENTAS, dtype={COL_CLIENTE: "string"})
-        ventas = preparar_ventas(ventas_raw)
+        hojas = load_local_workbook_sheets(str(VENTAS_FILE), VENTAS_FILE.stat().st_mtime, HOJAS_VENTAS)
+        ventas = preparar_ventas(hoja_ventas(hojas))
         # 1) Catálogo desde la hoja del mismo Excel
-        catalogo = cargar_catalogo_mismo_excel("local")
+        catalogo = cargar_catalogo_mismo_excel(hojas)
         # 2) Si no, archivo de catálogo local opcional
         if catalogo is None:
             catalogo = cargar_catalogo_local(CATALOGO_FILE, SHEET_CATALOGO)
@@ -291,7 +438,8 @@ except Exception as e:
     st.error(f"Problema al leer los datos: {e}")
     st.stop()
 
-base = calcular_directorio(ventas)
+# Con la fecha en la llave, la caché sirve todo el día y se invalida sola al cambiar de día
+base = calcular_directorio(ventas, hoy_utc())
 df = merge_catalogo(base, catalogo)
 
 # Filtros
@@ -299,7 +447,7 @@ st.subheader("Buscar y filtrar")
 fc1, fc2, fc3, fc4 = st.columns([2, 1, 1, 2])
 texto = fc1.text_input("Buscar (Cliente / Ciudad / Correo / País / Provincia / Teléfono)", "")
 estatus = fc2.selectbox("Estatus", ["Todos", "En uso", "Disponible"])
-vendedores = ["Todos"] + sorted(df["UltimoVendedor"].dropna().astype(str).unique().tolist())
+vendedores = ["Todos"] + df["UltimoVendedor"].cat.categories.tolist()
 vendedor = fc3.selectbox("Vendedor", vendedores)
 min_d = int(df["Dias_desde_ultima_venta"].min(skipna=True)) if "Dias_desde_ultima_venta" in df else 0
 max_d = int(df["Dias_desde_ultima_venta"].max(skipna=True)) if "Dias_desde_ultima_venta" in df else 0
@@ -310,24 +458,18 @@ rango = fc4.slider(
     value=(min(0, min_d), max(0, max_d)),
 )
 
-# Aplicar filtros
-f = df.copy()
-
-def _contains_any(row, q: str) -> bool:
-    q = q.lower()
-    campos = [COL_CLIENTE, CAT_CIUDAD, CAT_EMAIL, CAT_PAIS, CAT_PROV, CAT_TEL]
-    for c in campos:
-        if c in row and pd.notna(row[c]) and q in str(row[c]).lower():
-            return True
-    return False
-
+# Aplicar filtros: una sola máscara booleana y un único iloc al final
+mask = np.ones(len(df), dtype=bool)
 if texto:
-    f = f[f.apply(lambda r: _contains_any(r, texto), axis=1)]
+    mask &= df[COL_BUSQUEDA].str.contains(texto.lower(), regex=False, na=False).to_numpy(dtype=bool)
 if estatus != "Todos":
-    f = f[f["Estatus"] == estatus]
+    mask &= (df["Estatus"] == estatus).to_numpy()
 if vendedor != "Todos":
-    f = f[f["UltimoVendedor"].astype(str) == vendedor]
-f = f[(f["Dias_desde_ultima_venta"] >= rango[0]) & (f["Dias_desde_ultima_venta"] <= rango[1])]
+    mask &= (df["UltimoVendedor"] == vendedor).to_numpy()
+# numexpr evalúa ambas comparaciones en una sola pasada sobre la columna
+dia_min, dia_max = rango
+mask &= df.eval("@dia_min <= Dias_desde_ultima_venta <= @dia_max", engine="numexpr").to_numpy()
+f = df.iloc[np.flatnonzero(mask)].drop(columns=COL_BUSQUEDA)
 
 st.success(f"Registros: {len(f):,}")
 st.dataframe(f, use_container_width=True, height=520)
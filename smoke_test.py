@@ -0,0 +1,90 @@
+# smoke_test.py
+# ------------------------------------------------------------------
+# Comprobaciones rápidas del cálculo del directorio (sin UI ni Drive).
+# Corre con `python -m pytest smoke_test.py` o `python smoke_test.py`.
+# ------------------------------------------------------------------
+
+from pathlib import Path
+import sys
+import types
+import numpy as np
+import pandas as pd
+
+APP = Path(__file__).with_name("Directorio_App.py")
+
+
+def _cargar_app() -> dict:
+    """Ejecuta Directorio_App.py hasta la sección de UI y devuelve sus definiciones."""
+    src = APP.read_text(encoding="utf-8").split("# === (E) UI")[0]
+    # Módulo registrado en sys.modules: la caché de numba lo busca ahí al recargar el kernel
+    mod = types.ModuleType("_directorio_app_smoke")
+    mod.__file__ = str(APP)
+    sys.modules[mod.__name__] = mod
+    exec(compile(src, str(APP), "exec"), mod.__dict__)
+    return mod.__dict__
+
+
+app = _cargar_app()
+
+
+def _ventas_prueba() -> pd.DataFrame:
+    """Ventas con empates en la fecha máxima y un cliente sin ninguna fecha."""
+    c, v = app["COL_CLIENTE"], app["COL_VENDEDOR"]
+    f1, f2 = pd.Timestamp("2025-03-01"), pd.Timestamp("2025-05-01")
+    filas = [
+        (" Empate ", "Primero", f2), ("Empate", "Segundo", f2), ("Empate", "Viejo", f1),
+        ("SinFecha", "Zeta", pd.NaT), ("SinFecha", "Alfa", pd.NaT),
+        ("Uno", None, f2), ("Uno", "Antes", f1),
+    ]
+    # Muchos empates: fechas sin hora repartidas entre pocos días
+    rng = np.random.default_rng(0)
+    n = 5000
+    filas += list(zip(
+        [f"C{i}" for i in rng.integers(0, 300, n)],
+        [f"V{i}" for i in rng.integers(0, 20, n)],
+        pd.Timestamp("2025-01-01") + pd.to_timedelta(rng.integers(0, 10, n), "D"),
+    ))
+    df = pd.DataFrame(filas, columns=[c, v, "Fechadepedido"])
+    return app["preparar_ventas"](df)
+
+
+def _backends() -> dict:
+    """Las tres agregaciones por cliente; polars y numba solo si están instalados."""
+    backends = {"pandas": app["_agregar_clientes_pandas"]}
+    if app["pl"] is not None:
+        backends["polars"] = app["_agregar_clientes_polars"]
+    if app["njit"] is not None:
+        backends["numba"] = app["_agregar_clientes_numba"]
+    return backends
+
+
+def _agregar(fn, ventas: pd.DataFrame) -> pd.DataFrame:
+    df = ventas.copy()
+    df[app["COL_CLIENTE"]] = df[app["COL_CLIENTE"]].str.strip()
+    out = fn(df)[[app["COL_CLIENTE"], "UltimaFechaVenta", "UltimoVendedor"]]
+    out = out.astype({"UltimoVendedor": "string[pyarrow]", app["COL_CLIENTE"]: "string[pyarrow]"})
+    return out.sort_values(app["COL_CLIENTE"]).reset_index(drop=True)
+
+
+def test_backends_coinciden():
+    ventas = _ventas_prueba()
+    res = {nombre: _agregar(fn, ventas) for nombre, fn in _backends().items()}
+    ref = res["pandas"]
+    for nombre, out in res.items():
+        pd.testing.assert_frame_equal(out, ref, check_dtype=False, obj=nombre)
+
+
+def test_empates_y_sin_fecha():
+    ventas = _ventas_prueba()
+    for nombre, fn in _backends().items():
+        out = _agregar(fn, ventas).set_index(app["COL_CLIENTE"])
+        assert out.loc["Empate", "UltimoVendedor"] == "Primero", nombre
+        assert pd.isna(out.loc["SinFecha", "UltimoVendedor"]), nombre
+        assert pd.isna(out.loc["SinFecha", "UltimaFechaVenta"]), nombre
+        assert pd.isna(out.loc["Uno", "UltimoVendedor"]), nombre
+
+
+if __name__ == "__main__":
+    test_backends_coinciden()
+    test_empates_y_sin_fecha()
+    print("OK:", ", ".join(_backends()))